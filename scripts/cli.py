@@ -1,9 +1,15 @@
 import argparse
 import os
+import time
 from pathlib import Path
 
+from agent_runner import AgentRunner
+from archiver import ArchiveError, package_projects, verify_archive
 from mcp_client import MCPClient, MCPClientError
+from node_index import NodeIndex
 from orchestrator import Orchestrator
+from step_queue import DEFAULT_LEASE_SECONDS, DEFAULT_QUEUE_PATH, StepQueue, StepQueueError
+from worker import run_worker
 
 
 def cmd_check(args: argparse.Namespace) -> int:
@@ -25,29 +31,164 @@ def cmd_check(args: argparse.Namespace) -> int:
 
 def cmd_run(args: argparse.Namespace) -> int:
     orch = Orchestrator(plan_path=args.plan)
-    orch.run()
+    try:
+        orch.run()
+    except StepQueueError as exc:
+        print(f"ERROR: {exc}")
+        return 1
     return 0
 
 
 def cmd_resume(args: argparse.Namespace) -> int:
-    orch = Orchestrator(plan_path=args.plan)
-    orch.run()
-    return 0
+    return cmd_run(args)
 
 
 def cmd_package(args: argparse.Namespace) -> int:
-    import zipfile
-    project = args.project or "unnamed_project"
-    src_dir = Path("deliverables") / project
-    if not src_dir.exists():
-        print(f"No deliverables for project '{project}' at {src_dir}")
+    root = Path("deliverables")
+    if args.all:
+        projects = sorted(p.name for p in root.iterdir() if p.is_dir() and not p.name.startswith(".")) if root.exists() else []
+    else:
+        projects = args.project or ["unnamed_project"]
+    missing = [p for p in projects if not (root / p).is_dir()]
+    if missing or not projects:
+        for project in missing:
+            print(f"No deliverables for project '{project}' at {root / project}")
+        if not projects:
+            print(f"No projects found under {root}")
+        return 2
+    if args.base and len(projects) > 1:
+        print("--base applies to a single project")
         return 2
-    out = Path(args.output or f"package-{project}.zip")
-    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
-        for p in src_dir.rglob("*"):
-            if p.is_file():
-                zf.write(p, p.relative_to(src_dir.parent))
-    print(f"Wrote {out}")
+
+    suffix = f"-{time.strftime('%Y%m%d%H%M%S')}" if args.incremental else ""
+    # --output names a file only for a single --project without a trailing separator.
+    output = args.output or ""
+    as_dir = (
+        args.all
+        or len(projects) > 1
+        or output.endswith(("/", os.sep))
+        or Path(output or ".").is_dir()
+    )
+    if as_dir:
+        out_dir = Path(output or ".")
+        out_dir.mkdir(parents=True, exist_ok=True)
+        jobs = [(p, out_dir / f"package-{p}{suffix}.zip") for p in projects]
+    else:
+        jobs = [(projects[0], Path(output))]
+
+    try:
+        results = package_projects(
+            root,
+            jobs,
+            incremental=args.incremental,
+            base=Path(args.base) if args.base else None,
+            workers=args.workers,
+        )
+    except ArchiveError as exc:
+        print(f"ERROR: {exc}")
+        return 1
+    for r in results:
+        kind = "incremental" if r["incremental"] else "full"
+        print(
+            f"Wrote {r['output']} ({kind}: {r['files_added']}/{r['files_total']} files, "
+            f"{r['files_stored']} stored uncompressed, {r['files_deleted']} deleted)"
+        )
+    return 0
+
+
+def cmd_verify(args: argparse.Namespace) -> int:
+    status = 0
+    for archive in args.archive:
+        result = verify_archive(Path(archive))
+        if result["ok"]:
+            print(f"OK: {archive} ({result['files_checked']} files match manifest)")
+            continue
+        status = 1
+        print(f"FAILED: {archive}")
+        for error in result["errors"]:
+            print(f"  - {error}")
+    return status
+
+
+def cmd_queue_purge(args: argparse.Namespace) -> int:
+    queue = StepQueue(Path(args.queue or os.getenv("BMAD_QUEUE_PATH", DEFAULT_QUEUE_PATH)).expanduser())
+    try:
+        removed = queue.purge(older_than=args.older_than, project=args.project, include_active=args.include_active)
+        remaining = ", ".join(f"{status}={count}" for status, count in sorted(queue.counts().items())) or "empty"
+    finally:
+        queue.close()
+    print(f"Purged {removed} step(s) from {queue.path}; remaining: {remaining}")
+    return 0
+
+
+def cmd_worker(args: argparse.Namespace) -> int:
+    queue = StepQueue(Path(args.queue or os.getenv("BMAD_QUEUE_PATH", DEFAULT_QUEUE_PATH)).expanduser())
+    runner = AgentRunner(mcp_client=MCPClient.from_env(), node_index=NodeIndex.from_env(readonly=True))
+    try:
+        run_worker(
+            queue,
+            runner,
+            lease_seconds=args.lease,
+            poll_interval=args.poll,
+            max_idle=args.max_idle,
+            max_steps=args.max_steps,
+        )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        queue.close()
+    return 0
+
+
+def _open_index(args: argparse.Namespace, create: bool, readonly: bool = False) -> NodeIndex | None:
+    """Open the index at --path or $MCP_NODE_INDEX; None if missing and not ``create``."""
+    if not args.path:
+        return NodeIndex.from_env(create=create, readonly=readonly)
+    path = Path(args.path).expanduser()
+    if not create and not path.exists():
+        return None
+    return NodeIndex(path, readonly=readonly)
+
+
+def _index_sync(args: argparse.Namespace, refresh: bool) -> int:
+    client = MCPClient.from_env()
+    if not client:
+        print("MCP not configured. Set N8N_MCP_URL and MCP_AUTH_TOKEN.")
+        return 2
+    index = _open_index(args, create=not refresh)
+    if not index:
+        print("No node index found. Run 'index build' first.")
+        return 2
+    try:
+        if refresh:
+            summary = index.refresh(client, args.node_type or None, max_age=args.max_age)
+        else:
+            summary = index.build(client, args.node_type or None)
+    except MCPClientError as exc:
+        print(f"ERROR: {exc}")
+        return 1
+    finally:
+        index.close()
+    print(f"OK: {summary} -> {index.path}")
+    return 0
+
+
+def cmd_index_build(args: argparse.Namespace) -> int:
+    return _index_sync(args, refresh=False)
+
+
+def cmd_index_refresh(args: argparse.Namespace) -> int:
+    return _index_sync(args, refresh=True)
+
+
+def cmd_index_search(args: argparse.Namespace) -> int:
+    index = _open_index(args, create=False, readonly=True)
+    if not index:
+        print("No node index found. Run 'index build' first.")
+        return 2
+    for hit in index.search(args.query, limit=args.limit):
+        print(f"{hit['node_type']} [{hit['tool']}]: {hit['snippet']}")
+    index.close()
     return 0
 
 
@@ -68,10 +209,52 @@ def build_parser() -> argparse.ArgumentParser:
     prr.set_defaults(func=cmd_resume)
 
     pp = sub.add_parser("package", help="Zip deliverables for transport")
-    pp.add_argument("--project")
-    pp.add_argument("--output")
+    pp.add_argument("--project", action="append", help="Project to package (repeatable)")
+    pp.add_argument("--all", action="store_true", help="Package every project under deliverables/")
+    pp.add_argument("--output", help="Archive path for one project, or output directory for several")
+    pp.add_argument("--incremental", action="store_true", help="Only add files changed since the last package")
+    pp.add_argument("--base", help="Archive or manifest to diff against (default: last package state)")
+    pp.add_argument("--workers", type=int, default=4, help="Projects compressed in parallel")
     pp.set_defaults(func=cmd_package)
 
+    pv = sub.add_parser("verify", help="Check archives against their manifests without extracting")
+    pv.add_argument("archive", nargs="+")
+    pv.set_defaults(func=cmd_verify)
+
+    pw = sub.add_parser("worker", help="Execute queued steps (BMAD_EXECUTION_BACKEND=queue)")
+    pw.add_argument("--queue", help="Queue database (default: $BMAD_QUEUE_PATH or .cache/step_queue.sqlite)")
+    pw.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS, help="Lease length in seconds")
+    pw.add_argument("--poll", type=float, default=1.0, help="Seconds between polls when idle")
+    pw.add_argument("--max-idle", type=float, help="Exit after this many idle seconds")
+    pw.add_argument("--max-steps", type=int, help="Exit after completing this many steps")
+    pw.set_defaults(func=cmd_worker)
+
+    pq = sub.add_parser("queue", help="Maintain the step queue database")
+    qsub = pq.add_subparsers(dest="queue_cmd", required=True)
+    pqp = qsub.add_parser("purge", help="Delete finished steps from earlier runs")
+    pqp.add_argument("--queue", help="Queue database (default: $BMAD_QUEUE_PATH or .cache/step_queue.sqlite)")
+    pqp.add_argument("--older-than", type=float, help="Only steps last updated more than this many seconds ago")
+    pqp.add_argument("--project", help="Only steps of this project's runs")
+    pqp.add_argument("--include-active", action="store_true", help="Also delete pending and claimed steps")
+    pqp.set_defaults(func=cmd_queue_purge)
+
+    pi = sub.add_parser("index", help="Local node catalog index backed by MCP")
+    isub = pi.add_subparsers(dest="index_cmd", required=True)
+    pib = isub.add_parser("build", help="Fetch node essentials and examples into the index")
+    pib.add_argument("--node-type", action="append", help="Limit to node type (repeatable)")
+    pib.add_argument("--path", help="Index file (default: $MCP_NODE_INDEX or .cache/node_index.sqlite)")
+    pib.set_defaults(func=cmd_index_build)
+    pir = isub.add_parser("refresh", help="Fetch only new, missing or stale entries")
+    pir.add_argument("--node-type", action="append", help="Limit to node type (repeatable)")
+    pir.add_argument("--max-age", type=float, help="Re-fetch entries older than this many seconds")
+    pir.add_argument("--path")
+    pir.set_defaults(func=cmd_index_refresh)
+    pis = isub.add_parser("search", help="Full-text search the local index")
+    pis.add_argument("query")
+    pis.add_argument("--limit", type=int, default=10)
+    pis.add_argument("--path")
+    pis.set_defaults(func=cmd_index_search)
+
     return p
 
 
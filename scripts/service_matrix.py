@@ -1,114 +1,351 @@
 """
 Service Matrix: non-destructive readiness check for local dev stack.
 
-Checks reachability and basic responses for:
+Checks reachability and basic responses for the targets listed in a config
+file (default: scripts/service_matrix.yml), for example:
 - n8n (http port)
 - Supabase (http port)
 - Postgres (tcp port)
+- n8n-mcp HTTP (JSON-RPC initialize handshake)
 - n8n-mcp stdio (file/binary presence only; stdio handshake is IDE-owned)
 - Filesystem root path
 
+All checks run concurrently, so a down service costs one timeout in total
+rather than one per check.
+
 Usage:
   PYTHONPATH=src python3 scripts/service_matrix.py
+  PYTHONPATH=src python3 scripts/service_matrix.py --config my_matrix.yml --strict
+  PYTHONPATH=src python3 scripts/service_matrix.py --watch --interval 5 --window 300
 
-Outputs one JSON report to stdout.
+Outputs one JSON report to stdout (one per round in --watch mode). With
+--strict the exit code is 1 when any service is unavailable or outside its
+thresholds, so the script can gate batch runs.
 """
 from __future__ import annotations
 
+import argparse
 import json
 import os
 import socket
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 try:
     import requests  # type: ignore
 except Exception:  # pragma: no cover
     requests = None  # Fallback to socket-only checks if requests missing
 
+try:
+    import yaml  # type: ignore
+except Exception:  # pragma: no cover
+    yaml = None  # JSON configs still work without PyYAML
+
+DEFAULT_CONFIG_PATH = Path(__file__).with_name("service_matrix.yml")
+
+def _elapsed_ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 1)
+
 
 def http_probe(url: str, timeout: float = 2.0) -> Dict[str, Any]:
-    t0 = time.time()
+    t0 = time.perf_counter()
     if not requests:
-        return {"ok": False, "error": "requests-not-installed", "latency_ms": int((time.time()-t0)*1000)}
+        return {"ok": False, "error": "requests-not-installed", "latency_ms": _elapsed_ms(t0)}
     try:
         r = requests.get(url, timeout=timeout)
         return {
             "ok": True,
             "status": r.status_code,
-            "latency_ms": int((time.time() - t0) * 1000),
+            "latency_ms": _elapsed_ms(t0),
             "excerpt": (r.text[:120] if isinstance(r.text, str) else None),
         }
     except Exception as exc:
-        return {"ok": False, "error": str(exc), "latency_ms": int((time.time()-t0)*1000)}
+        return {"ok": False, "error": str(exc), "latency_ms": _elapsed_ms(t0)}
 
 
 def tcp_probe(host: str, port: int, timeout: float = 1.0) -> Dict[str, Any]:
-    t0 = time.time()
+    t0 = time.perf_counter()
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     s.settimeout(timeout)
     try:
         s.connect((host, port))
+        return {"ok": True, "latency_ms": _elapsed_ms(t0)}
+    except Exception as exc:
+        return {"ok": False, "error": str(exc), "latency_ms": _elapsed_ms(t0)}
+    finally:
         s.close()
-        return {"ok": True, "latency_ms": int((time.time() - t0) * 1000)}
+
+
+def mcp_initialize_probe(url: str, token: Optional[str], timeout: float = 2.0) -> Dict[str, Any]:
+    """Measure a real MCP JSON-RPC ``initialize`` round trip (no retries)."""
+    t0 = time.perf_counter()
+    if not requests:
+        return {"ok": False, "error": "requests-not-installed", "latency_ms": _elapsed_ms(t0)}
+    if not url:
+        return {"ok": False, "error": "no-url-configured", "latency_ms": _elapsed_ms(t0)}
+    payload = {
+        "jsonrpc": "2.0",
+        "id": "service-matrix",
+        "method": "initialize",
+        "params": {"protocolVersion": "1.0", "clientInfo": {"name": "service-matrix", "version": "0.1"}},
+    }
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    try:
+        r = requests.post(f"{url.rstrip('/')}/mcp", data=json.dumps(payload), headers=headers, timeout=timeout)
+        latency = _elapsed_ms(t0)
+        data = r.json()
+        if "result" not in data:
+            return {"ok": False, "status": r.status_code, "error": str(data.get("error", data))[:120],
+                    "latency_ms": latency}
+        server = data["result"].get("serverInfo", {})
+        return {"ok": True, "status": r.status_code, "latency_ms": latency,
+                "server": f"{server.get('name', '?')}/{server.get('version', '?')}"}
     except Exception as exc:
-        return {"ok": False, "error": str(exc), "latency_ms": int((time.time()-t0)*1000)}
+        return {"ok": False, "error": str(exc), "latency_ms": _elapsed_ms(t0)}
 
 
 def exists(path: str) -> bool:
     return Path(path).exists()
 
 
-def main() -> None:
+# ----------------------------------------------------------------------
+def load_config(path: Optional[str]) -> Dict[str, Any]:
+    """Load a YAML or JSON matrix config (default: scripts/service_matrix.yml)."""
+    config_path = Path(path) if path else DEFAULT_CONFIG_PATH
+    if not config_path.exists():
+        raise SystemExit(f"Config file not found: {config_path} (pass --config to use another)")
+    text = config_path.read_text(encoding="utf-8")
+    try:
+        if config_path.suffix in (".yml", ".yaml"):
+            if not yaml:
+                raise SystemExit("PyYAML is required for YAML configs; use a .json config instead")
+            config = yaml.safe_load(text) or {}
+        else:
+            config = json.loads(text)
+    except (ValueError, getattr(yaml, "YAMLError", ValueError)) as exc:
+        raise SystemExit(f"Invalid config {config_path}: {exc}") from None
+    validate_config(config, config_path)
+    return config
+
+
+# Keys each check type needs in addition to "type".
+CHECK_REQUIRED_KEYS: Dict[str, Tuple[str, ...]] = {
+    "http": ("url",),
+    "tcp": ("port",),
+    "mcp_initialize": (),
+    "path": ("path",),
+}
+
+
+def validate_config(config: Any, source: Any = "config") -> None:
+    """Exit with a clear message if the matrix config is malformed."""
+    def fail(message: str) -> None:
+        raise SystemExit(f"Invalid config {source}: {message}")
+
+    if not isinstance(config, dict):
+        fail("top level must be a mapping")
+    if not isinstance(config.get("defaults", {}), dict):
+        fail("'defaults' must be a mapping")
+    services = config.get("services")
+    if not isinstance(services, list) or not services:
+        fail("'services' must be a non-empty list")
+    for i, svc in enumerate(services):
+        if not isinstance(svc, dict) or not isinstance(svc.get("name"), str) or not svc["name"]:
+            fail(f"services[{i}] needs a 'name'")
+        checks = svc.get("checks")
+        if not isinstance(checks, list) or not checks:
+            fail(f"service '{svc['name']}' needs at least one check")
+        for j, check in enumerate(checks):
+            kind = check.get("type") if isinstance(check, dict) else None
+            if kind not in CHECK_REQUIRED_KEYS:
+                fail(
+                    f"service '{svc['name']}' checks[{j}] has unknown type {kind!r} "
+                    f"(expected one of: {', '.join(CHECK_REQUIRED_KEYS)})"
+                )
+            missing = [k for k in CHECK_REQUIRED_KEYS[kind] if k not in check]
+            if missing:
+                fail(f"service '{svc['name']}' checks[{j}] ({kind}) is missing {', '.join(missing)}")
+
+
+def _expand(value: Any) -> Any:
+    if isinstance(value, str):
+        return os.path.expanduser(os.path.expandvars(value))
+    return value
+
+
+def run_check(check: Dict[str, Any], default_timeout: float) -> Dict[str, Any]:
+    kind = check.get("type")
+    timeout = float(check.get("timeout", default_timeout))
+    if kind == "http":
+        return http_probe(_expand(check["url"]), timeout=timeout)
+    if kind == "tcp":
+        return tcp_probe(_expand(check.get("host", "127.0.0.1")), int(check["port"]), timeout=timeout)
+    if kind == "mcp_initialize":
+        url = _expand(check.get("url", "${N8N_MCP_URL}"))
+        # An unset variable stays literal after expandvars; treat it as unconfigured.
+        url = "" if "$" in url else url
+        return mcp_initialize_probe(url, os.getenv(check.get("token_env", "MCP_AUTH_TOKEN")), timeout=timeout)
+    if kind == "path":
+        return {"ok": exists(_expand(check["path"]))}
+    return {"ok": False, "error": f"unknown check type: {kind}"}
+
+
+def probe_all(config: Dict[str, Any], pool: ThreadPoolExecutor) -> Dict[str, Any]:
+    """Run every check concurrently and assemble the single-round report."""
+    defaults = config.get("defaults", {})
+    default_timeout = float(defaults.get("timeout", 2.0))
+    default_thresholds = defaults.get("thresholds", {})
+    services = config.get("services", [])
+
+    futures = [
+        [pool.submit(run_check, check, default_timeout) for check in svc.get("checks", [])]
+        for svc in services
+    ]
+
     report: Dict[str, Any] = {
         "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
         "services": []
     }
+    for svc, svc_futures in zip(services, futures):
+        thresholds = {**default_thresholds, **svc.get("thresholds", {})}
+        entry: Dict[str, Any] = {"name": svc["name"], "checks": []}
+        for check, fut in zip(svc.get("checks", []), svc_futures):
+            name = check.get("name") or f"{check.get('type')} check"
+            entry["checks"].append({"name": name, **fut.result()})
+        entry["available"] = all(c.get("ok") for c in entry["checks"])
+        limit = thresholds.get("latency_ms")
+        entry["within_threshold"] = entry["available"] and (
+            limit is None or all(c.get("latency_ms", 0) <= limit for c in entry["checks"])
+        )
+        report["services"].append(entry)
 
-    # n8n http
-    n8n = {"name": "n8n", "checks": []}
-    p = http_probe("http://localhost:5678/rest/workflows")
-    n8n["checks"].append({"name": "GET /rest/workflows", **p})
-    n8n["available"] = bool(p.get("ok"))
-    report["services"].append(n8n)
-
-    # supabase http
-    supa = {"name": "supabase", "checks": []}
-    p = http_probe("http://localhost:8000")
-    supa["checks"].append({"name": "GET /", **p})
-    supa["available"] = bool(p.get("ok"))
-    report["services"].append(supa)
-
-    # postgres tcp
-    pg = {"name": "postgres", "checks": []}
-    p = tcp_probe("127.0.0.1", 5432)
-    pg["checks"].append({"name": "tcp 5432", **p})
-    pg["available"] = bool(p.get("ok"))
-    report["services"].append(pg)
-
-    # n8n-mcp stdio presence
-    mcp = {"name": "n8n-mcp-stdio", "checks": []}
-    binary = exists("/Volumes/SSD_OSX/Devssd/Projects/n8n-mcp/dist/mcp/index.js")
-    db = exists("/Volumes/SSD_OSX/Devssd/Projects/n8n-mcp/data/nodes.db")
-    mcp["checks"].append({"name": "binary", "ok": binary})
-    mcp["checks"].append({"name": "nodes.db", "ok": db})
-    mcp["available"] = binary and db
-    report["services"].append(mcp)
-
-    # filesystem path presence
-    fs = {"name": "filesystem-root", "checks": []}
-    root_ok = exists("/Volumes/SSD_OSX/Devssd/Projects/n8n-mcp")
-    fs["checks"].append({"name": "path exists", "ok": root_ok})
-    fs["available"] = root_ok
-    report["services"].append(fs)
-
-    # summary
     ok_count = sum(1 for s in report["services"] if s.get("available"))
     report["summary"] = {"services_total": len(report["services"]), "services_ok": ok_count}
+    return report
+
+
+# ----------------------------------------------------------------------
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile; ``None`` for an empty sample."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(-(-pct * len(ordered) // 100)))
+    return ordered[rank - 1]
+
+
+def window_stats(
+    config: Dict[str, Any], history: Deque[Tuple[float, Dict[str, Any]]], window: float
+) -> Dict[str, Any]:
+    """Summarise availability and latency percentiles per service over the window."""
+    default_thresholds = config.get("defaults", {}).get("thresholds", {})
+    thresholds_by_name = {
+        s["name"]: {**default_thresholds, **s.get("thresholds", {})} for s in config.get("services", [])
+    }
+    per_service: Dict[str, Dict[str, Any]] = {}
+    for _, report in history:
+        for svc in report["services"]:
+            agg = per_service.setdefault(svc["name"], {"samples": 0, "up": 0, "checks": {}})
+            agg["samples"] += 1
+            agg["up"] += 1 if svc["available"] else 0
+            for check in svc["checks"]:
+                if "latency_ms" in check:
+                    # Percentiles describe successful probes; failures show up in availability.
+                    latencies = agg["checks"].setdefault(check["name"], [])
+                    if check.get("ok"):
+                        latencies.append(check["latency_ms"])
+
+    services = []
+    for name, agg in per_service.items():
+        thresholds = thresholds_by_name.get(name, default_thresholds)
+        availability = round(agg["up"] / agg["samples"], 4)
+        checks = []
+        for check_name, latencies in agg["checks"].items():
+            checks.append({
+                "name": check_name,
+                "p50_ms": _percentile(latencies, 50),
+                "p95_ms": _percentile(latencies, 95),
+                "p99_ms": _percentile(latencies, 99),
+                "max_ms": max(latencies) if latencies else None,
+            })
+        p95_limit = thresholds.get("p95_ms")
+        healthy = availability >= float(thresholds.get("availability", 1.0)) and (
+            p95_limit is None or all(c["p95_ms"] is None or c["p95_ms"] <= p95_limit for c in checks)
+        )
+        services.append({
+            "name": name,
+            "samples": agg["samples"],
+            "availability": availability,
+            "healthy": healthy,
+            "checks": checks,
+        })
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "window_s": window,
+        "services": services,
+        "summary": {
+            "services_total": len(services),
+            "services_healthy": sum(1 for s in services if s["healthy"]),
+        },
+    }
+
+
+def prune_history(history: Deque[Tuple[float, Dict[str, Any]]], now: float, window: float) -> None:
+    """Drop rounds that started more than ``window`` seconds before ``now``."""
+    while history and history[0][0] < now - window:
+        history.popleft()
+
+
+def watch(config: Dict[str, Any], pool: ThreadPoolExecutor, interval: float, window: float,
+          count: Optional[int]) -> Dict[str, Any]:
+    history: Deque[Tuple[float, Dict[str, Any]]] = deque()
+    stats: Dict[str, Any] = {}
+    rounds = 0
+    try:
+        while count is None or rounds < count:
+            started = time.monotonic()
+            history.append((started, probe_all(config, pool)))
+            prune_history(history, started, window)
+            stats = window_stats(config, history, window)
+            print(json.dumps(stats), flush=True)
+            rounds += 1
+            if count is not None and rounds >= count:
+                break
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        pass
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Non-destructive readiness check for the local dev stack")
+    parser.add_argument("--config", help=f"YAML/JSON matrix config (default: scripts/{DEFAULT_CONFIG_PATH.name})")
+    parser.add_argument("--watch", action="store_true", help="Probe repeatedly and report rolling latency stats")
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between watch rounds")
+    parser.add_argument("--window", type=float, default=300.0, help="Seconds of history in watch stats")
+    parser.add_argument("--count", type=int, help="Stop watching after this many rounds")
+    parser.add_argument("--strict", action="store_true", help="Exit 1 if any service fails or breaches thresholds")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    workers = max(1, sum(len(s.get("checks", [])) for s in config.get("services", [])))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if args.watch:
+            stats = watch(config, pool, args.interval, args.window, args.count)
+            passed = bool(stats) and all(s["healthy"] for s in stats["services"])
+        else:
+            report = probe_all(config, pool)
+            print(json.dumps(report, indent=2))
+            passed = all(s["within_threshold"] for s in report["services"])
 
-    print(json.dumps(report, indent=2))
+    return 1 if args.strict and not passed else 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
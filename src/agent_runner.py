@@ -1,16 +1,32 @@
 import os
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
-from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.messages import AIMessage, SystemMessage, HumanMessage
 
 from mcp_client import MCPClient, MCPClientError
+from node_index import NodeIndex
+
+class FakeLLM:
+    """Deterministic offline stand-in for a chat model (MODEL_PROVIDER=fake).
+
+    Echoes the task line so local runs and queue-worker tests need no API key.
+    """
+
+    def invoke(self, messages):
+        human = messages[-1].content
+        task = human.split("--- TASK ---\n", 1)[-1].split("\n\n", 1)[0]
+        return AIMessage(content=f"[fake-llm] {task}")
+
 
 class AgentRunner:
-    def __init__(self, mcp_client: MCPClient | None = None):
+    def __init__(self, mcp_client: MCPClient | None = None, node_index: NodeIndex | None = None):
         self.model_provider = os.getenv("MODEL_PROVIDER", "openai").lower()
         model_name = ""
 
-        if self.model_provider == "anthropic":
+        if self.model_provider == "fake":
+            model_name = "echo"
+            self.llm = FakeLLM()
+        elif self.model_provider == "anthropic":
             api_key = os.getenv("ANTHROPIC_API_KEY")
             if not api_key:
                 raise ValueError("ANTHROPIC_API_KEY not set for 'anthropic'")
@@ -36,6 +52,10 @@ class AgentRunner:
         else:
             print("[AgentRunner] MCP client not configured. Set N8N_MCP_URL and MCP_AUTH_TOKEN to enable.")
 
+        self.node_index = node_index
+        if self.node_index:
+            print(f"[AgentRunner] Local node index enabled ({self.node_index.path})")
+
     def _find_agent_prompt_path(self, agent_name: str) -> str:
         """Finds the prompt file for a given agent name."""
         agent_dirs = ["agents/fused", "agents/bmad_core", "agents/n8n_mcp_core"]
@@ -53,7 +73,7 @@ class AgentRunner:
 
         enriched_context = dict(context)
 
-        if self.mcp_client and mcp_tools:
+        if (self.mcp_client or self.node_index) and mcp_tools:
             enriched_context["mcp_results"] = self._collect_mcp_results(mcp_tools)
 
         human_message_content = self._format_human_message(enriched_context)
@@ -92,6 +112,14 @@ class AgentRunner:
                 continue
             alias = entry.get("alias") or name
             arguments = entry.get("arguments") or {}
+            if self.node_index:
+                cached = self.node_index.lookup(name, arguments)
+                if cached is not None:
+                    results[alias] = cached
+                    continue
+            if not self.mcp_client:
+                results[alias] = f"MCP error for {name}: not in local node index and no MCP client configured"
+                continue
             try:
                 text = self.mcp_client.call_tool_text(name, arguments)
                 results[alias] = text
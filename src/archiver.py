@@ -0,0 +1,301 @@
+"""Manifest-based packaging of ``deliverables/<project>`` directories.
+
+Every archive carries a ``MANIFEST.json`` describing the full project
+snapshot (path, size, mtime, sha256) and which files the archive actually
+contains. Incremental archives only include files whose content changed since
+the base manifest, and list removed files under ``deleted``. The manifest of
+the last package is kept in ``deliverables/.packages/<project>.manifest.json``
+so incremental runs neither re-hash nor re-ship files whose size and mtime are
+unchanged. Full packages always hash the bytes they write.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+MANIFEST_NAME = "MANIFEST.json"
+MANIFEST_VERSION = 1
+STATE_DIR = ".packages"
+
+# Below this size deflate overhead outweighs any savings.
+MIN_COMPRESS_SIZE = 1024
+# Formats that are already compressed; deflating them again only costs time.
+COMPRESSED_SUFFIXES = {
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar", ".lz4",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".mp3", ".mp4", ".mov", ".pdf",
+    ".woff", ".woff2", ".parquet",
+}
+# Sample size and ratio used to detect incompressible blobs without a known suffix.
+SAMPLE_SIZE = 64 * 1024
+INCOMPRESSIBLE_RATIO = 0.9
+
+
+class ArchiveError(RuntimeError):
+    """Raised when an archive or manifest cannot be read."""
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def should_compress(path: Path, size: int) -> bool:
+    """Return False for tiny files and data that is already compressed."""
+    if size < MIN_COMPRESS_SIZE or path.suffix.lower() in COMPRESSED_SUFFIXES:
+        return False
+    with path.open("rb") as handle:
+        sample = handle.read(SAMPLE_SIZE)
+    return len(zlib.compress(sample, 1)) < len(sample) * INCOMPRESSIBLE_RATIO
+
+
+def state_path(deliverables_root: Path, project: str) -> Path:
+    return deliverables_root / STATE_DIR / f"{project}.manifest.json"
+
+
+def load_manifest(path: Path) -> Optional[Dict[str, Any]]:
+    """Read a manifest from a sidecar JSON file or from inside an archive.
+
+    Returns ``None`` if ``path`` does not exist; raises :class:`ArchiveError`
+    if it exists but holds no readable manifest.
+    """
+    if not path.exists():
+        return None
+    try:
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as zf:
+                return json.loads(zf.read(MANIFEST_NAME))
+        return json.loads(path.read_text(encoding="utf-8"))
+    except KeyError:
+        raise ArchiveError(f"{path} has no {MANIFEST_NAME}") from None
+    except (ValueError, OSError, zipfile.BadZipFile) as exc:
+        raise ArchiveError(f"Cannot read manifest from {path}: {exc}") from exc
+
+
+def scan(
+    src_dir: Path,
+    previous: Optional[Dict[str, Any]] = None,
+    workers: int = 4,
+    *,
+    hash_files: bool = True,
+) -> Dict[str, Dict[str, Any]]:
+    """Describe every file under ``src_dir``, reusing hashes of unchanged files.
+
+    With ``hash_files=False`` only size and mtime are recorded; the caller is
+    expected to fill in ``sha256`` itself.
+    """
+    previous_files = (previous or {}).get("files", {})
+    entries: Dict[str, Dict[str, Any]] = {}
+    to_hash: List[str] = []
+    for p in sorted(src_dir.rglob("*")):
+        if not p.is_file():
+            continue
+        rel = p.relative_to(src_dir).as_posix()
+        st = p.stat()
+        entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        old = previous_files.get(rel)
+        if old and old.get("size") == st.st_size and old.get("mtime_ns") == st.st_mtime_ns:
+            entry["sha256"] = old["sha256"]
+        elif hash_files:
+            to_hash.append(rel)
+        entries[rel] = entry
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for rel, digest in zip(to_hash, pool.map(lambda r: _sha256(src_dir / r), to_hash)):
+            entries[rel]["sha256"] = digest
+    return entries
+
+
+def _write_member(zf: zipfile.ZipFile, path: Path, arcname: str, compress: bool) -> tuple[int, str]:
+    """Stream ``path`` into the archive; return the size and sha256 of the bytes written."""
+    info = zipfile.ZipInfo.from_file(path, arcname)
+    info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    digest = hashlib.sha256()
+    size = 0
+    with path.open("rb") as src, zf.open(info, "w") as dst:
+        for chunk in iter(lambda: src.read(1024 * 1024), b""):
+            digest.update(chunk)
+            dst.write(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def package_project(
+    deliverables_root: Path,
+    project: str,
+    output: Path,
+    *,
+    incremental: bool = False,
+    base: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """Write one project archive and record its manifest as the new package state.
+
+    With ``incremental`` only files that differ from the base manifest (``base``
+    if given, otherwise the last recorded package state) are added; files whose
+    size and mtime match the base are assumed unchanged. A full package ignores
+    the previous hashes and records those of the bytes it wrote.
+    """
+    src_dir = deliverables_root / project
+    if not src_dir.is_dir():
+        raise FileNotFoundError(f"No deliverables for project '{project}' at {src_dir}")
+
+    state = state_path(deliverables_root, project)
+    previous = load_manifest(base) if base else load_manifest(state)
+    if incremental and base and previous is None:
+        raise ArchiveError(f"Base manifest not found at {base}")
+    if incremental and previous:
+        files = scan(src_dir, previous)
+    else:
+        # Every file is written below, which hashes it anyway.
+        files = scan(src_dir, hash_files=False)
+
+    previous_files = (previous or {}).get("files", {})
+    if incremental and previous:
+        changed = [rel for rel, e in files.items() if previous_files.get(rel, {}).get("sha256") != e["sha256"]]
+        deleted = sorted(set(previous_files) - set(files))
+    else:
+        changed = list(files)
+        deleted = []
+
+    stored = 0
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zf:
+        for rel in changed:
+            path = src_dir / rel
+            compress = should_compress(path, files[rel]["size"])
+            stored += 0 if compress else 1
+            size, digest = _write_member(zf, path, f"{project}/{rel}", compress)
+            files[rel].update(size=size, sha256=digest, included=True)
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "project": project,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "incremental": bool(incremental and previous),
+            "base_created_at": previous.get("created_at") if incremental and previous else None,
+            "files": files,
+            "deleted": deleted,
+        }
+        zf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+
+    state.parent.mkdir(parents=True, exist_ok=True)
+    state.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return {
+        "project": project,
+        "output": str(output),
+        "files_total": len(files),
+        "files_added": len(changed),
+        "files_stored": stored,
+        "files_deleted": len(deleted),
+        "incremental": manifest["incremental"],
+    }
+
+
+def package_projects(
+    deliverables_root: Path,
+    jobs: List[tuple[str, Path]],
+    *,
+    incremental: bool = False,
+    base: Optional[Path] = None,
+    workers: int = 4,
+) -> List[Dict[str, Any]]:
+    """Package several projects concurrently (zlib releases the GIL while deflating)."""
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as pool:
+        futures = [
+            pool.submit(package_project, deliverables_root, project, output, incremental=incremental, base=base)
+            for project, output in jobs
+        ]
+        return [f.result() for f in futures]
+
+
+def _manifest_problem(manifest: Any) -> Optional[str]:
+    """Return why ``manifest`` cannot be verified against, or ``None`` if it can."""
+    if not isinstance(manifest, dict):
+        return f"{MANIFEST_NAME} is not an object"
+    if not isinstance(manifest.get("project"), str):
+        return f"{MANIFEST_NAME} has no project name"
+    files = manifest.get("files")
+    if not isinstance(files, dict):
+        return f"{MANIFEST_NAME} has no files table"
+    for rel, entry in files.items():
+        if not isinstance(entry, dict) or not isinstance(entry.get("size"), int) or not isinstance(entry.get("sha256"), str):
+            return f"{MANIFEST_NAME} entry for {rel} lacks size/sha256"
+    return None
+
+
+def verify_archive(path: Path) -> Dict[str, Any]:
+    """Check archive members against its manifest by streaming, without extracting.
+
+    Never raises for a bad archive; problems are reported under ``errors``.
+    """
+    if not path.is_file():
+        return {"ok": False, "archive": str(path), "errors": ["archive not found"]}
+    if not zipfile.is_zipfile(path):
+        return {"ok": False, "archive": str(path), "errors": ["not a zip archive"]}
+    try:
+        with zipfile.ZipFile(path) as zf:
+            try:
+                manifest = json.loads(zf.read(MANIFEST_NAME))
+            except KeyError:
+                return {"ok": False, "archive": str(path), "errors": [f"{MANIFEST_NAME} missing"]}
+            except (ValueError, zipfile.BadZipFile, zlib.error) as exc:
+                return {"ok": False, "archive": str(path), "errors": [f"unreadable {MANIFEST_NAME}: {exc}"]}
+            problem = _manifest_problem(manifest)
+            if problem:
+                return {"ok": False, "archive": str(path), "errors": [problem]}
+            project = manifest["project"]
+            members = {info.filename: info for info in zf.infolist()}
+            errors: List[str] = []
+            expected = set()
+            for rel, entry in manifest["files"].items():
+                if not entry.get("included"):
+                    continue
+                name = f"{project}/{rel}"
+                expected.add(name)
+                info = members.get(name)
+                if info is None:
+                    errors.append(f"missing: {rel}")
+                    continue
+                if info.file_size != entry["size"]:
+                    errors.append(f"size mismatch: {rel}")
+                    continue
+                digest = hashlib.sha256()
+                try:
+                    with zf.open(info) as handle:
+                        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+                            digest.update(chunk)
+                except (zipfile.BadZipFile, zlib.error, EOFError) as exc:
+                    errors.append(f"corrupt: {rel} ({exc})")
+                    continue
+                if digest.hexdigest() != entry["sha256"]:
+                    errors.append(f"hash mismatch: {rel}")
+            for name in sorted(set(members) - expected - {MANIFEST_NAME}):
+                errors.append(f"unexpected: {name}")
+    except (zipfile.BadZipFile, OSError) as exc:
+        return {"ok": False, "archive": str(path), "errors": [f"corrupt archive: {exc}"]}
+    return {
+        "ok": not errors,
+        "archive": str(path),
+        "project": project,
+        "files_checked": len(expected),
+        "errors": errors,
+    }
+
+
+__all__ = [
+    "ArchiveError",
+    "MANIFEST_NAME",
+    "load_manifest",
+    "package_project",
+    "package_projects",
+    "scan",
+    "should_compress",
+    "verify_archive",
+]
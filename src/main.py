@@ -13,8 +13,9 @@ def main():
     if not os.getenv("MODEL_PROVIDER"):
         print("Warning: MODEL_PROVIDER is not set in .env. Defaulting to 'openai'.")
 
-    # Basic check for API keys
-    if not os.getenv("OPENAI_API_KEY") and not os.getenv("ANTHROPIC_API_KEY"):
+    # Basic check for API keys (the offline "fake" provider needs none)
+    fake = os.getenv("MODEL_PROVIDER", "").lower() == "fake"
+    if not fake and not os.getenv("OPENAI_API_KEY") and not os.getenv("ANTHROPIC_API_KEY"):
         print("\nERROR: No AI provider API key found in .env file.")
         print("Please set either OPENAI_API_KEY or ANTHROPIC_API_KEY.\n")
         return
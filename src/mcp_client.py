@@ -18,6 +18,11 @@ from typing import Any, Dict, Iterable, Optional
 import requests
 
 
+def tool_call_key(name: str, arguments: Optional[Dict[str, Any]] = None) -> str:
+    """Stable key for a tool call, as used by simulation fixtures and the node index."""
+    return f"tools/call::{name}::{json.dumps(arguments or {}, sort_keys=True)}"
+
+
 class MCPClientError(RuntimeError):
     """Raised when the MCP server returns an error response."""
 
@@ -187,8 +192,7 @@ class MCPClient:
             return method
         name = params.get("name") if params else ""
         args = params.get("arguments") if params else {}
-        args_key = json.dumps(args, sort_keys=True)
-        return f"tools/call::{name}::{args_key}"
+        return tool_call_key(name, args)
 
     def _append_fixture(self, fixtures_path: str, method: str, params: Optional[Dict[str, Any]], data: Dict[str, Any]) -> None:
         path = Path(fixtures_path).expanduser()
@@ -201,4 +205,4 @@ class MCPClient:
             pass
 
 
-__all__ = ["MCPClient", "MCPClientError", "MCPResponse"]
+__all__ = ["MCPClient", "MCPClientError", "MCPResponse", "tool_call_key"]
@@ -0,0 +1,324 @@
+"""Local SQLite index of read-only n8n-MCP catalog data.
+
+Node essentials and workflow examples rarely change between n8n-MCP releases,
+yet agents request them on every run. The index bulk-fetches those tool
+results once through :class:`MCPClient`, stores them keyed exactly like the
+simulation fixtures (tool name + sorted JSON arguments) and exposes full-text
+search over the cached text.
+
+Usage:
+    PYTHONPATH=src python3 scripts/cli.py index build
+    PYTHONPATH=src python3 scripts/cli.py index refresh
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from mcp_client import MCPClient, MCPClientError, tool_call_key
+
+SCHEMA_VERSION = 1
+DEFAULT_INDEX_PATH = ".cache/node_index.sqlite"
+# Initial page size for list_nodes; raised to the reported totalCount if truncated.
+LIST_NODES_LIMIT = 1000
+
+# Read-only tools served from the index, with the arguments used per node type.
+INDEXED_TOOLS: Dict[str, Callable[[str], Dict[str, Any]]] = {
+    "get_node_essentials": lambda node_type: {"nodeType": node_type},
+    "list_node_templates": lambda node_type: {"nodeTypes": [node_type]},
+}
+
+
+class NodeIndex:
+    """SQLite-backed cache of MCP catalog tool results with FTS5 search."""
+
+    def __init__(self, path: Path, *, readonly: bool = False) -> None:
+        self.path = Path(path)
+        self.readonly = readonly
+        if readonly:
+            # Agents only read the cache; never take the write lock on open.
+            self._conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._usable = self._schema_matches()
+            if not self._usable:
+                print(
+                    f"[NodeIndex] {self.path} has a different schema version; ignoring it "
+                    "until it is rebuilt with 'index build'."
+                )
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path))
+            self._ensure_schema()
+            self._usable = True
+
+    @classmethod
+    def from_env(cls, *, create: bool = False, readonly: bool = False) -> Optional["NodeIndex"]:
+        """Open the index at ``MCP_NODE_INDEX``; ``None`` if absent and not ``create``."""
+        path = Path(os.getenv("MCP_NODE_INDEX", DEFAULT_INDEX_PATH)).expanduser()
+        if not create and not path.exists():
+            return None
+        return cls(path, readonly=readonly)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # ------------------------------------------------------------------
+    def _schema_matches(self) -> bool:
+        try:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            self._conn.execute("SELECT 1 FROM entries LIMIT 1")
+        except sqlite3.DatabaseError:
+            return False
+        return bool(row) and row[0] == str(SCHEMA_VERSION)
+
+    def _ensure_schema(self) -> None:
+        """Create the tables (and stamp the schema version) only when needed."""
+        if self._schema_matches():
+            return
+        conn = self._conn
+        # The index is a cache; rebuild it rather than migrate.
+        conn.execute("DROP TABLE IF EXISTS entries")
+        conn.execute("DROP TABLE IF EXISTS entries_fts")
+        conn.execute("DROP TABLE IF EXISTS meta")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute(
+            """
+            CREATE TABLE entries (
+                id INTEGER PRIMARY KEY,
+                key TEXT UNIQUE NOT NULL,
+                tool TEXT NOT NULL,
+                node_type TEXT NOT NULL,
+                text TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE VIRTUAL TABLE entries_fts USING fts5(tool, node_type, text)")
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),)
+        )
+        conn.commit()
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    # ----------------------------- Reads ------------------------------
+    def lookup(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Return the cached text for a tool call, or ``None`` on a miss."""
+        if name not in INDEXED_TOOLS or not self._usable:
+            return None
+        row = self._conn.execute(
+            "SELECT text FROM entries WHERE key = ?",
+            (tool_call_key(name, arguments),),
+        ).fetchone()
+        return row[0] if row else None
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, str]]:
+        """Full-text search across cached entries, best matches first."""
+        if not self._usable:
+            return []
+        sql = (
+            "SELECT tool, node_type, snippet(entries_fts, 2, '[', ']', '...', 16) "
+            "FROM entries_fts WHERE entries_fts MATCH ? ORDER BY rank LIMIT ?"
+        )
+        try:
+            rows = self._conn.execute(sql, (query, limit)).fetchall()
+        except sqlite3.OperationalError:
+            # Not valid FTS5 syntax (e.g. "nodes-base.slack"); match it as a phrase.
+            phrase = '"' + query.replace('"', '""') + '"'
+            rows = self._conn.execute(sql, (phrase, limit)).fetchall()
+        return [{"tool": t, "node_type": n, "snippet": s} for t, n, s in rows]
+
+    def node_types(self) -> set[str]:
+        if not self._usable:
+            return set()
+        rows = self._conn.execute("SELECT DISTINCT node_type FROM entries").fetchall()
+        return {r[0] for r in rows}
+
+    def stats(self) -> Dict[str, Any]:
+        count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            "path": str(self.path),
+            "schema_version": SCHEMA_VERSION,
+            "server_version": self.get_meta("server_version"),
+            "built_at": self.get_meta("built_at"),
+            "refreshed_at": self.get_meta("refreshed_at"),
+            "entries": count,
+            "node_types": len(self.node_types()),
+        }
+
+    # ----------------------------- Writes -----------------------------
+    def _store(self, tool: str, node_type: str, arguments: Dict[str, Any], text: str) -> None:
+        key = tool_call_key(tool, arguments)
+        conn = self._conn
+        row = conn.execute("SELECT id FROM entries WHERE key = ?", (key,)).fetchone()
+        if row:
+            conn.execute(
+                "UPDATE entries SET text = ?, fetched_at = ? WHERE id = ?",
+                (text, time.time(), row[0]),
+            )
+            conn.execute("DELETE FROM entries_fts WHERE rowid = ?", (row[0],))
+            rowid = row[0]
+        else:
+            cur = conn.execute(
+                "INSERT INTO entries (key, tool, node_type, text, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (key, tool, node_type, text, time.time()),
+            )
+            rowid = cur.lastrowid
+        conn.execute(
+            "INSERT INTO entries_fts (rowid, tool, node_type, text) VALUES (?, ?, ?, ?)",
+            (rowid, tool, node_type, text),
+        )
+
+    def _remove_node_types(self, node_types: Iterable[str]) -> None:
+        for node_type in node_types:
+            self._conn.execute(
+                "DELETE FROM entries_fts WHERE rowid IN (SELECT id FROM entries WHERE node_type = ?)",
+                (node_type,),
+            )
+            self._conn.execute("DELETE FROM entries WHERE node_type = ?", (node_type,))
+
+    def _fetch(self, client: MCPClient, tools: List[str], node_types: Iterable[str]) -> Dict[str, int]:
+        fetched = failed = 0
+        for node_type in node_types:
+            for tool in tools:
+                arguments = INDEXED_TOOLS[tool](node_type)
+                try:
+                    text = client.call_tool_text(tool, arguments)
+                except MCPClientError as exc:
+                    print(f"[NodeIndex] {tool}({node_type}) failed: {exc}")
+                    failed += 1
+                    continue
+                self._store(tool, node_type, arguments, text)
+                fetched += 1
+            self._conn.commit()
+        return {"fetched": fetched, "failed": failed}
+
+    def build(self, client: MCPClient, node_types: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Fetch every indexed tool for every node type.
+
+        Without ``node_types`` the whole catalog from ``list_nodes`` is indexed and
+        node types the server no longer lists are pruned. With ``node_types`` only
+        those are (re)fetched and the rest of the index is left untouched.
+        """
+        server_version, tools = self._server_info(client)
+        previous_version = self.get_meta("server_version")
+        full = node_types is None
+        wanted = sorted(self._discover_node_types(client) if full else set(node_types))
+        removed = self.node_types() - set(wanted) if full else set()
+        self._remove_node_types(removed)
+        counts = self._fetch(client, tools, wanted)
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        if full or previous_version is None:
+            self._set_meta("server_version", server_version)
+            self._set_meta("built_at", now)
+        elif previous_version != server_version:
+            # Other node types still hold data from the previous server version;
+            # keep the old stamp so the next unfiltered refresh rebuilds them.
+            print(
+                f"[NodeIndex] Partial build against server {server_version}; run an unfiltered "
+                f"refresh to update the remaining entries from {previous_version}."
+            )
+        self._set_meta("refreshed_at", now)
+        self._conn.commit()
+        return {"node_types": len(wanted), "removed": len(removed), **counts}
+
+    def refresh(
+        self,
+        client: MCPClient,
+        node_types: Optional[Iterable[str]] = None,
+        *,
+        max_age: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Fetch only what changed: new node types, stale entries, or a new server version.
+
+        A changed server version invalidates everything and falls back to :meth:`build`.
+        Entries older than ``max_age`` seconds are re-fetched. ``node_types`` narrows
+        the refresh to those types; pruning only happens on an unfiltered refresh.
+        """
+        server_version, tools = self._server_info(client)
+        if server_version != self.get_meta("server_version"):
+            print(
+                f"[NodeIndex] Server version changed ({self.get_meta('server_version')} -> "
+                f"{server_version}); rebuilding."
+            )
+            return {"rebuilt": True, **self.build(client, node_types)}
+
+        full = node_types is None
+        wanted = set(self._discover_node_types(client)) if full else set(node_types)
+        have = self.node_types()
+        removed = have - wanted if full else set()
+        self._remove_node_types(removed)
+
+        pending = set(wanted - have)
+        if max_age is not None:
+            cutoff = time.time() - max_age
+            rows = self._conn.execute(
+                "SELECT DISTINCT node_type FROM entries WHERE fetched_at < ?", (cutoff,)
+            ).fetchall()
+            pending.update(r[0] for r in rows)
+        # Node types indexed before a tool became available are incomplete.
+        for tool in tools:
+            rows = self._conn.execute(
+                "SELECT DISTINCT node_type FROM entries WHERE node_type NOT IN "
+                "(SELECT node_type FROM entries WHERE tool = ?)",
+                (tool,),
+            ).fetchall()
+            pending.update(r[0] for r in rows)
+
+        counts = self._fetch(client, tools, sorted(pending & wanted))
+        self._set_meta("refreshed_at", time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
+        self._conn.commit()
+        return {"rebuilt": False, "node_types": len(pending & wanted), "removed": len(removed), **counts}
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _server_info(client: MCPClient) -> tuple[str, List[str]]:
+        init = client.initialize({"name": "bmad-index", "version": "0.1"})
+        server_version = str(init.result.get("serverInfo", {}).get("version", "unknown"))
+        available = {t.get("name") for t in client.list_tools()}
+        tools = [name for name in INDEXED_TOOLS if name in available]
+        if not tools:
+            raise MCPClientError(
+                f"MCP server exposes none of the indexable tools: {', '.join(INDEXED_TOOLS)}"
+            )
+        return server_version, tools
+
+    @staticmethod
+    def _discover_node_types(client: MCPClient) -> List[str]:
+        limit = LIST_NODES_LIMIT
+        while True:
+            text = client.call_tool_text("list_nodes", {"limit": limit})
+            try:
+                data = json.loads(text)
+            except ValueError as exc:
+                raise MCPClientError(f"Unexpected list_nodes response: {text[:120]}") from exc
+            nodes = data.get("nodes", []) if isinstance(data, dict) else data
+            found = []
+            for node in nodes:
+                node_type = node.get("nodeType") if isinstance(node, dict) else node
+                if node_type:
+                    found.append(node_type)
+            total = data.get("totalCount") if isinstance(data, dict) else None
+            if not isinstance(total, int) or len(found) >= total:
+                return found
+            if total > limit and limit == LIST_NODES_LIMIT:
+                # list_nodes has no offset; ask once more for the full catalog.
+                limit = total
+                continue
+            print(
+                f"[NodeIndex] Warning: list_nodes returned {len(found)} of {total} nodes; "
+                "the index will be incomplete."
+            )
+            return found
+
+
+__all__ = ["NodeIndex", "INDEXED_TOOLS", "SCHEMA_VERSION"]
@@ -1,10 +1,13 @@
 import yaml
 import os
+import uuid
 from agent_runner import AgentRunner
 from mcp_client import MCPClient
+from node_index import NodeIndex
+from step_queue import StepQueue
 
 class Orchestrator:
-    def __init__(self, plan_path: str):
+    def __init__(self, plan_path: str, step_queue: StepQueue | None = None):
         if not os.path.exists(plan_path):
             raise FileNotFoundError(f"Project plan not found at {plan_path}")
         with open(plan_path, 'r', encoding='utf-8') as f:
@@ -16,6 +19,12 @@ class Orchestrator:
 
         self.workflow = self._load_workflow()
         self.state = self._load_or_initialize_state()
+        # Scopes queued steps to this run, so a fresh state never picks up results
+        # left in the queue by an earlier run of the same project.
+        if "run_nonce" not in self.state:
+            self.state["run_nonce"] = uuid.uuid4().hex
+            self._save_state()
+        self.run_id = f"{self.project_name}:{self.state['run_nonce']}"
 
         self.mcp_client = MCPClient.from_env()
         if self.mcp_client:
@@ -23,7 +32,20 @@ class Orchestrator:
         else:
             print("[Orchestrator] MCP client not configured. Set N8N_MCP_URL and MCP_AUTH_TOKEN to enable.")
 
-        self.agent_runner = AgentRunner(mcp_client=self.mcp_client)
+        # Optional queue backend: steps run in `bmad worker` processes instead of in-process.
+        self.step_queue = step_queue or StepQueue.from_env()
+        timeout = os.getenv("BMAD_QUEUE_TIMEOUT")
+        self.queue_timeout = float(timeout) if timeout else None
+        if self.step_queue:
+            print(f"[Orchestrator] Queue execution backend enabled ({self.step_queue.path}); start workers with 'cli.py worker'.")
+            # Workers open their own node index; the orchestrator never runs agents.
+            self.node_index = None
+            self.agent_runner = None
+        else:
+            self.node_index = NodeIndex.from_env(readonly=True)
+            if self.node_index:
+                print(f"[Orchestrator] Local node index found at {self.node_index.path}; read-only MCP lookups will use it first.")
+            self.agent_runner = AgentRunner(mcp_client=self.mcp_client, node_index=self.node_index)
 
     def _load_workflow(self) -> dict:
         workflow_file = self.plan.get("workflow_definition")
@@ -61,9 +83,9 @@ class Orchestrator:
     def run(self):
         print(f"--- [Orchestrator] Initiating project: {self.project_name} ---")
 
-        import json
-        state_path = os.path.join(self.deliverables_path, "state.json")
         completed = set(self.state.get("completed", []))
+        # Queue backend only: steps enqueued but not yet collected, as (step_id, step, queue_id).
+        in_flight: list[tuple[str, dict, str]] = []
 
         for phase_index, phase in enumerate(self.workflow.get('phases', [])):
             phase_name = phase.get('name')
@@ -80,6 +102,11 @@ class Orchestrator:
                     print(f"--- [Orchestrator] Skipping completed step {step_id}")
                     continue
 
+                # A step may only start once the steps producing its inputs have finished.
+                pending_outputs = {s.get('output') for _, s, _ in in_flight}
+                if agent_name == "HumanReview" or pending_outputs.intersection(input_keys):
+                    self._collect_queued(in_flight, completed)
+
                 print(f"--- [Orchestrator] Delegating task to '{agent_name}': {task_description} ---")
 
                 if agent_name == "HumanReview":
@@ -87,33 +114,64 @@ class Orchestrator:
                     continue
 
                 context = {key: self.state.get(key) for key in input_keys}
-                context['task'] = task_description
 
-                mcp_tools = step.get('mcp_tools') if self.mcp_client else None
+                if self.step_queue:
+                    queue_id = self.step_queue.enqueue(
+                        self.run_id, step_id, agent_name, task_description, context, step.get('mcp_tools')
+                    )
+                    print(f"--- [Orchestrator] Enqueued step {step_id} ---")
+                    in_flight.append((step_id, step, queue_id))
+                    continue
+
+                context['task'] = task_description
+                mcp_tools = step.get('mcp_tools') if (self.mcp_client or self.node_index) else None
                 result = self.agent_runner.run_agent(agent_name, context, mcp_tools=mcp_tools)
+                self._record_step(step_id, step, result, completed)
 
-                if output_key:
-                    print(f"--- [Orchestrator] Storing output in state key: '{output_key}' ---")
-                    self.state[output_key] = result
-                    self.state["history"].append({"agent": agent_name, "task": task_description, "result": result})
-
-                    deliverable_path = os.path.join(self.deliverables_path, f"{output_key}.md")
-                    with open(deliverable_path, 'w', encoding='utf-8') as f:
-                        f.write(result)
-                    print(f"--- [Orchestrator] Intermediate deliverable saved to {deliverable_path} ---")
-
-                # checkpoint
-                completed.add(step_id)
-                self.state["completed"] = sorted(list(completed))
-                try:
-                    with open(state_path, 'w', encoding='utf-8') as f:
-                        json.dump(self.state, f, indent=2)
-                except Exception:
-                    pass
+            self._collect_queued(in_flight, completed)
 
         print(f"\n--- [Orchestrator] Project '{self.project_name}' completed successfully! ---")
         print(f"--- [Orchestrator] Final deliverables are in: {self.deliverables_path} ---")
 
+    def _collect_queued(self, in_flight: list, completed: set) -> None:
+        """Wait for enqueued steps and record their results in plan order."""
+        if not in_flight:
+            return
+        print(f"--- [Orchestrator] Waiting for {len(in_flight)} queued step(s) ---")
+        results = self.step_queue.wait_for(
+            [queue_id for _, _, queue_id in in_flight], timeout=self.queue_timeout
+        )
+        for step_id, step, queue_id in in_flight:
+            self._record_step(step_id, step, results[queue_id], completed)
+        in_flight.clear()
+
+    def _record_step(self, step_id: str, step: dict, result: str, completed: set) -> None:
+        agent_name = step.get('agent')
+        output_key = step.get('output')
+        if output_key:
+            print(f"--- [Orchestrator] Storing output in state key: '{output_key}' ---")
+            self.state[output_key] = result
+            self.state["history"].append({"agent": agent_name, "task": step.get('task'), "result": result})
+
+            deliverable_path = os.path.join(self.deliverables_path, f"{output_key}.md")
+            with open(deliverable_path, 'w', encoding='utf-8') as f:
+                f.write(result)
+            print(f"--- [Orchestrator] Intermediate deliverable saved to {deliverable_path} ---")
+
+        # checkpoint
+        completed.add(step_id)
+        self.state["completed"] = sorted(list(completed))
+        self._save_state()
+
+    def _save_state(self) -> None:
+        import json
+        state_path = os.path.join(self.deliverables_path, "state.json")
+        try:
+            with open(state_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=2)
+        except Exception:
+            pass
+
     def human_review_step(self, prompt_text: str):
         print(f"\n--- [Orchestrator] PAUSING for Human Review ---")
         print("--- Review generated deliverables in the deliverables folder. ---")
@@ -0,0 +1,280 @@
+"""Durable SQLite queue of workflow steps for multi-process execution.
+
+The Orchestrator enqueues ready steps (agent, task, resolved context, MCP tool
+requests); ``bmad worker`` processes claim them under a lease, run the agent
+and write the result back. A claim whose lease expires (worker crashed or
+stalled) becomes claimable again, up to ``max_attempts``.
+
+The database uses SQLite's default rollback journal rather than WAL, because
+WAL needs shared memory that only works when every process is on the same
+host. Sharing the queue between hosts also requires a filesystem with working
+POSIX advisory locks. Many NFS/SMB setups do not provide them, and SQLite can
+then corrupt the database.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_QUEUE_PATH = ".cache/step_queue.sqlite"
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+class StepQueueError(RuntimeError):
+    """Raised when a queued step fails permanently or waiting for it times out."""
+
+
+class StepQueue:
+    """Lease-based work queue shared by the Orchestrator and its workers."""
+
+    def __init__(self, path: Path, *, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        # Autocommit; multi-statement updates use explicit BEGIN IMMEDIATE.
+        self._conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA busy_timeout = 30000")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS steps (
+                id TEXT PRIMARY KEY,
+                run_id TEXT NOT NULL,
+                agent TEXT NOT NULL,
+                task TEXT,
+                context TEXT NOT NULL,
+                mcp_tools TEXT,
+                payload_hash TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                result TEXT,
+                error TEXT,
+                enqueued_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS steps_status ON steps (status, enqueued_at)")
+
+    @classmethod
+    def from_env(cls) -> Optional["StepQueue"]:
+        """Return a queue when ``BMAD_EXECUTION_BACKEND=queue``, else ``None``."""
+        if os.getenv("BMAD_EXECUTION_BACKEND", "local").lower() != "queue":
+            return None
+        path = Path(os.getenv("BMAD_QUEUE_PATH", DEFAULT_QUEUE_PATH)).expanduser()
+        return cls(path)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # ------------------------- Orchestrator side ----------------------
+    def enqueue(
+        self,
+        run_id: str,
+        step_id: str,
+        agent: str,
+        task: Optional[str],
+        context: Dict[str, Any],
+        mcp_tools: Optional[List[Dict[str, Any]]] = None,
+    ) -> str:
+        """Queue a step and return its queue id.
+
+        Re-enqueueing an identical step (e.g. on resume) keeps its existing row,
+        so a result produced before the orchestrator restarted is reused. A
+        changed payload resets the row to pending.
+        """
+        queue_id = f"{run_id}::{step_id}"
+        context_json = json.dumps(context, sort_keys=True, default=str)
+        tools_json = json.dumps(mcp_tools or [], sort_keys=True)
+        payload_hash = hashlib.sha256(
+            "\0".join([agent, task or "", context_json, tools_json]).encode("utf-8")
+        ).hexdigest()
+        now = time.time()
+        self._conn.execute(
+            """
+            INSERT INTO steps (id, run_id, agent, task, context, mcp_tools, payload_hash, enqueued_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                agent = excluded.agent, task = excluded.task, context = excluded.context,
+                mcp_tools = excluded.mcp_tools, payload_hash = excluded.payload_hash,
+                status = 'pending', attempts = 0, lease_owner = NULL, lease_expires = NULL,
+                result = NULL, error = NULL, enqueued_at = excluded.enqueued_at,
+                updated_at = excluded.updated_at
+            WHERE steps.payload_hash != excluded.payload_hash OR steps.status = 'failed'
+            """,
+            (queue_id, run_id, agent, task, context_json, tools_json, payload_hash, now, now),
+        )
+        return queue_id
+
+    def wait_for(
+        self,
+        queue_ids: Iterable[str],
+        *,
+        poll_interval: float = 0.5,
+        timeout: Optional[float] = None,
+        progress_interval: Optional[float] = 30.0,
+    ) -> Dict[str, str]:
+        """Block until every step is done and return ``{queue_id: result}``.
+
+        Prints a progress line every ``progress_interval`` seconds. Raises
+        :class:`StepQueueError` as soon as one step fails permanently or when
+        ``timeout`` elapses.
+        """
+        remaining = set(queue_ids)
+        results: Dict[str, str] = {}
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else None
+        next_progress = started + progress_interval if progress_interval else None
+        while remaining:
+            placeholders = ",".join("?" * len(remaining))
+            rows = self._conn.execute(
+                f"SELECT id, status, result, error, attempts FROM steps "
+                f"WHERE id IN ({placeholders}) AND status IN ('done', 'failed')",
+                tuple(remaining),
+            ).fetchall()
+            for row in rows:
+                if row["status"] == "failed":
+                    raise StepQueueError(
+                        f"Step {row['id']} failed after {row['attempts']} attempt(s): {row['error']}"
+                    )
+                results[row["id"]] = row["result"]
+                remaining.discard(row["id"])
+            if remaining:
+                now = time.monotonic()
+                if deadline is not None and now > deadline:
+                    raise StepQueueError(
+                        f"Timed out after {timeout:g}s waiting for steps ({self._describe(remaining)}): "
+                        f"{', '.join(sorted(remaining))}"
+                    )
+                if next_progress is not None and now >= next_progress:
+                    print(
+                        f"[StepQueue] Still waiting after {now - started:.0f}s for "
+                        f"{len(remaining)} step(s): {self._describe(remaining)}"
+                    )
+                    next_progress = now + progress_interval
+                time.sleep(poll_interval)
+        return results
+
+    def _describe(self, queue_ids: Iterable[str]) -> str:
+        ids = tuple(queue_ids)
+        placeholders = ",".join("?" * len(ids))
+        rows = self._conn.execute(
+            f"SELECT status, COUNT(*) FROM steps WHERE id IN ({placeholders}) GROUP BY status", ids
+        ).fetchall()
+        counts = {status: count for status, count in rows}
+        return f"{counts.get('pending', 0)} pending, {counts.get('claimed', 0)} claimed"
+
+    # --------------------------- Worker side --------------------------
+    def claim(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        """Atomically lease the oldest pending (or lease-expired) step."""
+        now = time.time()
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Expired leases that already used every attempt fail instead of requeueing.
+            conn.execute(
+                "UPDATE steps SET status = 'failed', error = 'lease expired on final attempt', "
+                "lease_owner = NULL, updated_at = ? "
+                "WHERE status = 'claimed' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT * FROM steps WHERE status = 'pending' "
+                "OR (status = 'claimed' AND lease_expires < ?) ORDER BY enqueued_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE steps SET status = 'claimed', attempts = attempts + 1, lease_owner = ?, "
+                "lease_expires = ?, updated_at = ? WHERE id = ?",
+                (worker_id, now + lease_seconds, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return {
+            "id": row["id"],
+            "run_id": row["run_id"],
+            "agent": row["agent"],
+            "task": row["task"],
+            "context": json.loads(row["context"]),
+            "mcp_tools": json.loads(row["mcp_tools"]) or None,
+            "attempt": row["attempts"] + 1,
+        }
+
+    def heartbeat(self, queue_id: str, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Extend a lease; False means it was lost to another worker."""
+        cur = self._conn.execute(
+            "UPDATE steps SET lease_expires = ?, updated_at = ? "
+            "WHERE id = ? AND status = 'claimed' AND lease_owner = ?",
+            (time.time() + lease_seconds, time.time(), queue_id, worker_id),
+        )
+        return cur.rowcount == 1
+
+    def complete(self, queue_id: str, worker_id: str, result: str) -> bool:
+        """Record a result; ignored (False) if the lease now belongs to someone else."""
+        cur = self._conn.execute(
+            "UPDATE steps SET status = 'done', result = ?, error = NULL, lease_owner = NULL, "
+            "lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND status = 'claimed' AND lease_owner = ?",
+            (result, time.time(), queue_id, worker_id),
+        )
+        return cur.rowcount == 1
+
+    def fail(self, queue_id: str, worker_id: str, error: str) -> bool:
+        """Release a step after an error, failing it permanently once attempts run out."""
+        cur = self._conn.execute(
+            "UPDATE steps SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND status = 'claimed' AND lease_owner = ?",
+            (self.max_attempts, error, time.time(), queue_id, worker_id),
+        )
+        return cur.rowcount == 1
+
+    # ---------------------------- Maintenance -------------------------
+    def purge(
+        self,
+        *,
+        older_than: Optional[float] = None,
+        project: Optional[str] = None,
+        include_active: bool = False,
+    ) -> int:
+        """Delete finished steps and return how many rows were removed.
+
+        ``older_than`` keeps rows updated within that many seconds; ``project``
+        limits the purge to that project's runs. Pending and claimed steps are
+        only removed with ``include_active`` (e.g. after abandoning a run).
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+        if not include_active:
+            clauses.append("status IN ('done', 'failed')")
+        if older_than is not None:
+            clauses.append("updated_at < ?")
+            params.append(time.time() - older_than)
+        if project is not None:
+            # Run ids are "<project>:<run nonce>"; a bare project name predates nonces.
+            clauses.append("(run_id = ? OR substr(run_id, 1, ?) = ?)")
+            params.extend([project, len(project) + 1, f"{project}:"])
+        where = " AND ".join(clauses) or "1"
+        cur = self._conn.execute(f"DELETE FROM steps WHERE {where}", params)
+        return cur.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._conn.execute("SELECT status, COUNT(*) FROM steps GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+__all__ = ["StepQueue", "StepQueueError", "DEFAULT_LEASE_SECONDS"]
@@ -0,0 +1,98 @@
+"""Step worker for the queue execution backend.
+
+Run one or more workers (on any host that can reach the queue file) next to an
+Orchestrator started with ``BMAD_EXECUTION_BACKEND=queue``:
+
+    PYTHONPATH=src python3 scripts/cli.py worker --queue .cache/step_queue.sqlite
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Optional
+
+from agent_runner import AgentRunner
+from step_queue import DEFAULT_LEASE_SECONDS, StepQueue
+
+
+class _Heartbeat(threading.Thread):
+    """Keeps a claimed step's lease alive while the agent runs."""
+
+    def __init__(self, queue: StepQueue, queue_id: str, worker_id: str, lease_seconds: float) -> None:
+        super().__init__(daemon=True)
+        self._queue_path = queue.path
+        self._queue_id = queue_id
+        self._worker_id = worker_id
+        self._lease_seconds = lease_seconds
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        # sqlite3 connections are per-thread; the heartbeat opens its own.
+        queue = StepQueue(self._queue_path)
+        try:
+            while not self._stopped.wait(self._lease_seconds / 3):
+                if not queue.heartbeat(self._queue_id, self._worker_id, self._lease_seconds):
+                    print(f"[Worker] Lost lease on {self._queue_id}")
+                    return
+        finally:
+            queue.close()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+def run_worker(
+    queue: StepQueue,
+    runner: AgentRunner,
+    *,
+    worker_id: Optional[str] = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    poll_interval: float = 1.0,
+    max_idle: Optional[float] = None,
+    max_steps: Optional[int] = None,
+) -> int:
+    """Claim and execute steps until idle for ``max_idle`` seconds or ``max_steps`` ran.
+
+    Returns the number of steps completed by this worker.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    print(f"[Worker] {worker_id} polling {queue.path}")
+    completed = 0
+    idle_since = time.monotonic()
+    while max_steps is None or completed < max_steps:
+        step = queue.claim(worker_id, lease_seconds)
+        if step is None:
+            if max_idle is not None and time.monotonic() - idle_since >= max_idle:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        print(f"[Worker] Running {step['id']} (agent={step['agent']}, attempt {step['attempt']})")
+        context = dict(step["context"])
+        context["task"] = step["task"]
+        heartbeat = _Heartbeat(queue, step["id"], worker_id, lease_seconds)
+        heartbeat.start()
+        try:
+            result = runner.run_agent(step["agent"], context, mcp_tools=step["mcp_tools"])
+        except Exception as exc:  # report any agent failure back to the queue
+            heartbeat.stop()
+            queue.fail(step["id"], worker_id, f"{type(exc).__name__}: {exc}")
+            print(f"[Worker] {step['id']} failed: {exc}")
+        else:
+            heartbeat.stop()
+            if queue.complete(step["id"], worker_id, result):
+                completed += 1
+            else:
+                print(f"[Worker] Result for {step['id']} discarded; lease was reassigned")
+        idle_since = time.monotonic()
+
+    print(f"[Worker] {worker_id} exiting after {completed} step(s)")
+    return completed
+
+
+__all__ = ["run_worker"]
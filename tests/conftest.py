@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# Mirror `PYTHONPATH=src` from the README so tests import modules the same way.
+ROOT = Path(__file__).resolve().parents[1]
+for path in (ROOT / "src", ROOT / "scripts"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
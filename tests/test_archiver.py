@@ -0,0 +1,148 @@
+import json
+import os
+import zipfile
+
+import pytest
+
+import cli
+from archiver import ArchiveError, MANIFEST_NAME, load_manifest, package_project, verify_archive
+
+
+@pytest.fixture
+def deliverables(tmp_path):
+    project = tmp_path / "deliverables" / "demo"
+    (project / "sub").mkdir(parents=True)
+    (project / "prd.md").write_text("requirements " * 200)
+    (project / "tiny.txt").write_text("hi")
+    (project / "sub" / "blob.bin").write_bytes(os.urandom(20000))
+    return tmp_path / "deliverables"
+
+
+def test_full_package_round_trip(deliverables, tmp_path):
+    summary = package_project(deliverables, "demo", tmp_path / "full.zip")
+    assert summary["files_added"] == summary["files_total"] == 3
+    # tiny.txt and the random blob are stored, prd.md is deflated
+    assert summary["files_stored"] == 2
+
+    with zipfile.ZipFile(tmp_path / "full.zip") as zf:
+        types = {i.filename: i.compress_type for i in zf.infolist()}
+    assert types["demo/prd.md"] == zipfile.ZIP_DEFLATED
+    assert types["demo/sub/blob.bin"] == zipfile.ZIP_STORED
+
+    result = verify_archive(tmp_path / "full.zip")
+    assert result["ok"] and result["files_checked"] == 3
+
+
+def test_incremental_only_ships_changes_and_records_deletions(deliverables, tmp_path):
+    package_project(deliverables, "demo", tmp_path / "full.zip")
+    (deliverables / "demo" / "prd.md").write_text("changed " * 300)
+    (deliverables / "demo" / "tiny.txt").unlink()
+
+    summary = package_project(deliverables, "demo", tmp_path / "inc.zip", incremental=True)
+    assert summary["incremental"]
+    assert summary["files_added"] == 1
+    assert summary["files_deleted"] == 1
+
+    manifest = load_manifest(tmp_path / "inc.zip")
+    assert manifest["deleted"] == ["tiny.txt"]
+    with zipfile.ZipFile(tmp_path / "inc.zip") as zf:
+        assert sorted(zf.namelist()) == [MANIFEST_NAME, "demo/prd.md"]
+    assert verify_archive(tmp_path / "inc.zip")["ok"]
+
+
+def test_incremental_against_explicit_base(deliverables, tmp_path):
+    package_project(deliverables, "demo", tmp_path / "base.zip")
+    summary = package_project(
+        deliverables, "demo", tmp_path / "inc.zip", incremental=True, base=tmp_path / "base.zip"
+    )
+    assert summary["files_added"] == 0
+
+
+def test_verify_detects_tampering(deliverables, tmp_path):
+    package_project(deliverables, "demo", tmp_path / "full.zip")
+    with zipfile.ZipFile(tmp_path / "full.zip") as src, zipfile.ZipFile(tmp_path / "bad.zip", "w") as dst:
+        for info in src.infolist():
+            data = b"tampered" if info.filename == "demo/tiny.txt" else src.read(info)
+            dst.writestr(info.filename, data)
+        dst.writestr("demo/extra.txt", "x")
+
+    errors = verify_archive(tmp_path / "bad.zip")["errors"]
+    assert "size mismatch: tiny.txt" in errors
+    assert "unexpected: demo/extra.txt" in errors
+
+
+def test_verify_reports_unreadable_inputs(tmp_path):
+    assert verify_archive(tmp_path / "missing.zip")["errors"] == ["archive not found"]
+    (tmp_path / "notzip.zip").write_text("plain text")
+    assert verify_archive(tmp_path / "notzip.zip")["errors"] == ["not a zip archive"]
+    with zipfile.ZipFile(tmp_path / "plain.zip", "w") as zf:
+        zf.writestr("a.txt", "a")
+    assert verify_archive(tmp_path / "plain.zip")["errors"] == [f"{MANIFEST_NAME} missing"]
+
+
+def test_base_without_manifest_is_a_clean_error(deliverables, tmp_path):
+    with zipfile.ZipFile(tmp_path / "plain.zip", "w") as zf:
+        zf.writestr("a.txt", "a")
+    with pytest.raises(ArchiveError):
+        package_project(deliverables, "demo", tmp_path / "out.zip", incremental=True, base=tmp_path / "plain.zip")
+
+
+def test_cli_output_with_trailing_separator_is_a_directory(deliverables, monkeypatch, capsys):
+    monkeypatch.chdir(deliverables.parent)
+    assert cli.main(["package", "--project", "demo", "--output", "out/"]) == 0
+    assert (deliverables.parent / "out" / "package-demo.zip").is_file()
+
+    assert cli.main(["package", "--all", "--output", "packages"]) == 0
+    assert (deliverables.parent / "packages" / "package-demo.zip").is_file()
+
+    assert cli.main(["verify", "packages/package-demo.zip", "missing.zip"]) == 1
+    assert "FAILED: missing.zip" in capsys.readouterr().out
+
+
+def test_verify_reports_corrupt_archives_and_bad_manifests(deliverables, tmp_path, capsys):
+    package_project(deliverables, "demo", tmp_path / "full.zip")
+    data = (tmp_path / "full.zip").read_bytes()
+    (tmp_path / "corrupt.zip").write_bytes(data.replace(b"PK\x01\x02", b"XX\x01\x02"))
+    assert verify_archive(tmp_path / "corrupt.zip")["errors"][0].startswith("corrupt archive:")
+
+    bad_manifests = {
+        "list.zip": [],
+        "noproject.zip": {"files": {}},
+        "nofiles.zip": {"project": "demo"},
+        "nokeys.zip": {"project": "demo", "files": {"a.txt": {"included": True}}},
+    }
+    for name, manifest in bad_manifests.items():
+        with zipfile.ZipFile(tmp_path / name, "w") as zf:
+            zf.writestr(MANIFEST_NAME, json.dumps(manifest))
+        result = verify_archive(tmp_path / name)
+        assert not result["ok"] and len(result["errors"]) == 1
+
+    archives = [str(tmp_path / n) for n in ["corrupt.zip", *bad_manifests, "full.zip"]]
+    assert cli.main(["verify", *archives]) == 1
+    out = capsys.readouterr().out
+    assert out.count("FAILED:") == 5
+    assert f"OK: {tmp_path / 'full.zip'}" in out
+
+
+def test_same_size_rewrite_with_restored_mtime(deliverables, tmp_path):
+    package_project(deliverables, "demo", tmp_path / "first.zip")
+    prd = deliverables / "demo" / "prd.md"
+    st = prd.stat()
+    prd.write_text("REQUIREMENTS " * 200)
+    os.utime(prd, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    # A full package hashes what it writes instead of trusting the stat cache.
+    package_project(deliverables, "demo", tmp_path / "full.zip")
+    assert verify_archive(tmp_path / "full.zip")["ok"]
+    assert load_manifest(tmp_path / "full.zip")["files"]["prd.md"] != load_manifest(tmp_path / "first.zip")["files"]["prd.md"]
+
+    # Later incremental runs diff against the corrected hashes.
+    summary = package_project(
+        deliverables, "demo", tmp_path / "inc.zip", incremental=True, base=tmp_path / "full.zip"
+    )
+    assert summary["files_added"] == 0
+    prd.write_text("requirements " * 200)
+    os.utime(prd, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    summary = package_project(deliverables, "demo", tmp_path / "inc2.zip", incremental=True)
+    assert summary["files_added"] == 1
+    assert verify_archive(tmp_path / "inc2.zip")["ok"]
@@ -0,0 +1,117 @@
+import json
+
+from mcp_client import MCPResponse
+from node_index import NodeIndex
+
+
+class FakeClient:
+    """Duck-typed MCPClient serving a fixed catalog."""
+
+    def __init__(self, node_types, version="1.0", total=None):
+        self.node_types = list(node_types)
+        self.version = version
+        self.total = total
+        self.calls = []
+
+    def initialize(self, client_info=None):
+        return MCPResponse("initialize", {"result": {"serverInfo": {"version": self.version}}})
+
+    def list_tools(self):
+        return [{"name": "get_node_essentials"}, {"name": "list_nodes"}]
+
+    def call_tool_text(self, name, arguments=None):
+        self.calls.append((name, arguments))
+        if name == "list_nodes":
+            nodes = self.node_types[: arguments["limit"]]
+            total = self.total if self.total is not None else len(self.node_types)
+            return json.dumps({"nodes": [{"nodeType": t} for t in nodes], "totalCount": total})
+        return f"essentials for {arguments['nodeType']} ({self.version})"
+
+    def fetched(self):
+        return sorted(a["nodeType"] for n, a in self.calls if n == "get_node_essentials")
+
+
+def test_build_and_lookup(tmp_path):
+    index = NodeIndex(tmp_path / "index.sqlite")
+    summary = index.build(FakeClient(["a", "b"]))
+    assert summary["fetched"] == 2
+    assert index.lookup("get_node_essentials", {"nodeType": "a"}) == "essentials for a (1.0)"
+    assert index.lookup("get_node_essentials", {"nodeType": "zzz"}) is None
+    assert index.search("essentials")[0]["tool"] == "get_node_essentials"
+
+
+def test_filtered_refresh_does_not_prune(tmp_path):
+    index = NodeIndex(tmp_path / "index.sqlite")
+    index.build(FakeClient(["a", "b", "c"]))
+
+    summary = index.refresh(FakeClient(["a", "b", "c"]), ["a"], max_age=0)
+    assert summary["removed"] == 0
+    assert index.node_types() == {"a", "b", "c"}
+
+
+def test_filtered_build_on_version_change_does_not_prune(tmp_path):
+    index = NodeIndex(tmp_path / "index.sqlite")
+    index.build(FakeClient(["a", "b", "c"]))
+
+    client = FakeClient(["a", "b", "c"], version="2.0")
+    summary = index.refresh(client, ["a"])
+    assert summary["rebuilt"] and summary["removed"] == 0
+    assert index.node_types() == {"a", "b", "c"}
+    assert client.fetched() == ["a"]
+    # The remaining entries are still from 1.0, so the stamp must not move yet.
+    assert index.get_meta("server_version") == "1.0"
+
+
+def test_unfiltered_refresh_fetches_deltas_and_prunes(tmp_path):
+    index = NodeIndex(tmp_path / "index.sqlite")
+    index.build(FakeClient(["a", "b"]))
+
+    client = FakeClient(["b", "c"])
+    summary = index.refresh(client)
+    assert client.fetched() == ["c"]
+    assert summary["removed"] == 1
+    assert index.node_types() == {"b", "c"}
+
+
+def test_truncated_list_nodes_requests_full_catalog(tmp_path, monkeypatch):
+    import node_index
+
+    monkeypatch.setattr(node_index, "LIST_NODES_LIMIT", 2)
+    client = FakeClient(["a", "b", "c"])
+    index = NodeIndex(tmp_path / "index.sqlite")
+    index.build(client)
+    assert index.node_types() == {"a", "b", "c"}
+    assert [a["limit"] for n, a in client.calls if n == "list_nodes"] == [2, 3]
+
+
+def test_readonly_open_does_not_write(tmp_path):
+    path = tmp_path / "index.sqlite"
+    NodeIndex(path).build(FakeClient(["a"]))
+    before = path.stat().st_mtime_ns
+
+    index = NodeIndex(path, readonly=True)
+    assert index.lookup("get_node_essentials", {"nodeType": "a"}) == "essentials for a (1.0)"
+    index.close()
+    assert path.stat().st_mtime_ns == before
+
+
+def test_schema_mismatch_is_a_miss_on_read_and_rebuilt_on_write(tmp_path):
+    import sqlite3
+
+    path = tmp_path / "index.sqlite"
+    NodeIndex(path).build(FakeClient(["a"]))
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE meta SET value = '0' WHERE key = 'schema_version'")
+
+    reader = NodeIndex(path, readonly=True)
+    assert reader.lookup("get_node_essentials", {"nodeType": "a"}) is None
+    assert reader.search("essentials") == []
+    reader.close()
+    # The read left the old cache in place...
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 1
+
+    # ...and only a writable open resets it.
+    writer = NodeIndex(path)
+    assert writer.node_types() == set()
+    assert writer.get_meta("schema_version") == "1"
@@ -0,0 +1,123 @@
+import json
+import socket
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import service_matrix as sm
+
+
+@pytest.fixture
+def closed_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def write_config(tmp_path, config):
+    path = tmp_path / "matrix.json"
+    path.write_text(json.dumps(config))
+    return str(path)
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert sm._percentile(values, 50) == 50
+    assert sm._percentile(values, 95) == 95
+    assert sm._percentile(values, 99) == 99
+    assert sm._percentile([7.0], 99) == 7.0
+    assert sm._percentile([], 50) is None
+
+
+def _round(ok, latency):
+    return {"services": [{"name": "svc", "available": ok,
+                          "checks": [{"name": "tcp", "ok": ok, "latency_ms": latency}]}]}
+
+
+def test_window_stats_availability_and_p95_gate():
+    config = {"defaults": {"thresholds": {"p95_ms": 50, "availability": 0.75}},
+              "services": [{"name": "svc", "checks": []}]}
+    history = deque([(0, _round(True, 10.0)), (1, _round(True, 20.0)),
+                     (2, _round(True, 30.0)), (3, _round(False, 2000.0))])
+    stats = sm.window_stats(config, history, 60)
+    svc = stats["services"][0]
+    assert svc["availability"] == 0.75
+    # The failed probe counts against availability, not latency.
+    assert svc["checks"][0]["p95_ms"] == 30.0
+    assert svc["healthy"]
+
+    history.append((4, _round(True, 80.0)))
+    assert not sm.window_stats(config, history, 60)["services"][0]["healthy"]
+
+
+def test_prune_history_keeps_only_window():
+    history = deque([(0.0, {}), (5.0, {}), (9.0, {})])
+    sm.prune_history(history, now=10.0, window=5.0)
+    assert [t for t, _ in history] == [5.0, 9.0]
+
+
+def test_probe_all_thresholds(tmp_path, closed_port):
+    with socket.socket() as server:
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        open_port = server.getsockname()[1]
+        config = {
+            "defaults": {"timeout": 1.0, "thresholds": {"latency_ms": 1000}},
+            "services": [
+                {"name": "up", "checks": [{"type": "tcp", "port": open_port}]},
+                {"name": "slow", "thresholds": {"latency_ms": -1},
+                 "checks": [{"type": "tcp", "port": open_port}]},
+                {"name": "down", "checks": [{"type": "tcp", "port": closed_port}]},
+                {"name": "files", "checks": [{"type": "path", "path": str(tmp_path)}]},
+            ],
+        }
+        with ThreadPoolExecutor(4) as pool:
+            report = sm.probe_all(config, pool)
+    by_name = {s["name"]: s for s in report["services"]}
+    assert by_name["up"]["within_threshold"]
+    assert by_name["slow"]["available"] and not by_name["slow"]["within_threshold"]
+    assert not by_name["down"]["available"]
+    assert by_name["files"]["within_threshold"]
+    assert report["summary"] == {"services_total": 4, "services_ok": 3}
+
+
+@pytest.mark.parametrize("config, message", [
+    ({"services": [{"checks": [{"type": "path", "path": "/"}]}]}, "needs a 'name'"),
+    ({"services": [{"name": "a", "checks": []}]}, "at least one check"),
+    ({"services": [{"name": "a", "checks": [{"type": "ftp"}]}]}, "unknown type 'ftp'"),
+    ({"services": [{"name": "a", "checks": [{"type": "tcp"}]}]}, "missing port"),
+    ({"services": []}, "non-empty list"),
+])
+def test_load_config_rejects_malformed_configs(tmp_path, config, message):
+    with pytest.raises(SystemExit, match=message):
+        sm.load_config(write_config(tmp_path, config))
+
+
+def test_load_config_rejects_unparseable_files(tmp_path):
+    (tmp_path / "bad.json").write_text("{not json")
+    with pytest.raises(SystemExit, match="Invalid config"):
+        sm.load_config(str(tmp_path / "bad.json"))
+    (tmp_path / "bad.yml").write_text("services: [unclosed")
+    with pytest.raises(SystemExit, match="Invalid config"):
+        sm.load_config(str(tmp_path / "bad.yml"))
+
+
+def test_shipped_config_is_valid():
+    assert sm.load_config(None)["services"]
+
+
+def test_strict_exit_codes(tmp_path, closed_port, capsys):
+    down = write_config(tmp_path, {"services": [
+        {"name": "pg", "checks": [{"type": "tcp", "host": "127.0.0.1", "port": closed_port, "timeout": 0.5}]},
+    ]})
+    assert sm.main(["--config", down]) == 0
+    assert sm.main(["--config", down, "--strict"]) == 1
+    assert sm.main(["--config", down, "--strict", "--watch", "--count", "2", "--interval", "0"]) == 1
+
+    up = str(tmp_path / "up.json")
+    (tmp_path / "up.json").write_text(json.dumps(
+        {"services": [{"name": "fs", "checks": [{"type": "path", "path": str(tmp_path)}]}]}))
+    assert sm.main(["--config", up, "--strict"]) == 0
+    assert sm.main(["--config", up, "--strict", "--watch", "--count", "2", "--interval", "0"]) == 0
+    capsys.readouterr()
@@ -0,0 +1,205 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import cli
+from orchestrator import Orchestrator
+from step_queue import StepQueue, StepQueueError
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = StepQueue(tmp_path / "queue.sqlite", max_attempts=2)
+    yield q
+    q.close()
+
+
+def test_expired_lease_is_requeued(queue):
+    queue_id = queue.enqueue("run", "s1", "pm", "task", {"brief": "x"})
+    first = queue.claim("crashed", lease_seconds=0.05)
+    assert first["attempt"] == 1
+    assert queue.claim("other", lease_seconds=0.05) is None
+
+    time.sleep(0.1)
+    second = queue.claim("other", lease_seconds=60)
+    assert second["id"] == queue_id and second["attempt"] == 2
+    # The crashed worker's late result is discarded in favour of the new lease holder.
+    assert not queue.complete(queue_id, "crashed", "stale")
+    assert queue.complete(queue_id, "other", "fresh")
+    assert queue.wait_for([queue_id]) == {queue_id: "fresh"}
+
+
+def test_lease_expiry_on_final_attempt_fails_step(queue):
+    queue_id = queue.enqueue("run", "s1", "pm", "task", {})
+    queue.claim("w1", lease_seconds=0.05)
+    time.sleep(0.1)
+    queue.claim("w2", lease_seconds=0.05)
+    time.sleep(0.1)
+
+    assert queue.claim("w3") is None
+    assert queue.counts() == {"failed": 1}
+    with pytest.raises(StepQueueError, match="lease expired on final attempt"):
+        queue.wait_for([queue_id])
+
+
+def test_errors_retry_until_attempts_run_out(queue):
+    queue_id = queue.enqueue("run", "s1", "pm", "task", {})
+    queue.fail(queue.claim("w1")["id"], "w1", "boom")
+    assert queue.counts() == {"pending": 1}
+    queue.fail(queue.claim("w1")["id"], "w1", "boom")
+    with pytest.raises(StepQueueError, match="boom"):
+        queue.wait_for([queue_id])
+
+
+def test_reenqueue_reuses_results_unless_payload_changes(queue):
+    queue_id = queue.enqueue("run", "s1", "pm", "task", {"brief": "x"})
+    queue.complete(queue.claim("w1")["id"], "w1", "done")
+    queue.enqueue("run", "s1", "pm", "task", {"brief": "x"})
+    assert queue.counts() == {"done": 1}
+    queue.enqueue("run", "s1", "pm", "task", {"brief": "y"})
+    assert queue.counts() == {"pending": 1}
+    assert queue_id == "run::s1"
+
+
+def test_wait_for_times_out_without_workers(queue, capsys):
+    queue_id = queue.enqueue("run", "s1", "pm", "task", {})
+    with pytest.raises(StepQueueError, match="1 pending, 0 claimed"):
+        queue.wait_for([queue_id], poll_interval=0.01, timeout=0.1, progress_interval=0.02)
+    assert "Still waiting" in capsys.readouterr().out
+
+
+def test_purge_keeps_active_and_recent_steps(queue):
+    queue.enqueue("demo:old", "s1", "pm", "task", {})
+    queue.complete(queue.claim("w1")["id"], "w1", "done")
+    queue.enqueue("demo", "s1", "pm", "task", {})  # run id from before run nonces
+    queue.complete(queue.claim("w1")["id"], "w1", "done")
+    queue.enqueue("other:run", "s1", "pm", "task", {})
+    queue.complete(queue.claim("w1")["id"], "w1", "done")
+    queue.enqueue("demo:new", "s1", "pm", "task", {})
+
+    assert queue.purge(older_than=3600) == 0
+    assert queue.purge(project="demo") == 2
+    assert queue.counts() == {"done": 1, "pending": 1}
+    assert queue.purge(project="demo", include_active=True) == 1
+    assert queue.purge() == 1
+    assert queue.counts() == {}
+
+
+def test_cli_queue_purge(tmp_path, capsys):
+    queue = StepQueue(tmp_path / "queue.sqlite")
+    queue.enqueue("demo:a", "s1", "pm", "task", {})
+    queue.close()
+    assert cli.main(["queue", "purge", "--queue", str(tmp_path / "queue.sqlite"), "--include-active"]) == 0
+    assert "Purged 1 step(s)" in capsys.readouterr().out
+
+
+WORKFLOW = """
+phases:
+  - name: Planning
+    steps:
+      - {agent: pm, task: Write the plan, output: plan, inputs: [brief]}
+      - {agent: analyst, task: Research the market, output: research, inputs: [brief]}
+      - {agent: architect, task: Design the system, output: design, inputs: [plan]}
+  - name: Review
+    steps:
+      - {agent: qa, task: Review the design, output: review, inputs: [design, research]}
+"""
+
+
+@pytest.fixture
+def queued_project(tmp_path, monkeypatch):
+    (tmp_path / "workflows").mkdir()
+    (tmp_path / "workflows" / "wf.yaml").write_text(WORKFLOW)
+    (tmp_path / "plan.yml").write_text("project_name: demo\nworkflow_definition: wf.yaml\nbrief: A todo app\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("N8N_MCP_URL", raising=False)
+    monkeypatch.setenv("BMAD_EXECUTION_BACKEND", "queue")
+    monkeypatch.setenv("BMAD_QUEUE_PATH", str(tmp_path / "queue.sqlite"))
+    monkeypatch.setenv("BMAD_QUEUE_TIMEOUT", "60")
+    return tmp_path
+
+
+def test_fresh_state_gets_new_run_nonce(queued_project):
+    first = Orchestrator("plan.yml")
+    assert Orchestrator("plan.yml").run_id == first.run_id  # resumed from state.json
+    (queued_project / "deliverables" / "demo" / "state.json").unlink()
+    assert Orchestrator("plan.yml").run_id != first.run_id
+
+
+def _start_worker(queue_path: Path) -> subprocess.Popen:
+    env = dict(os.environ, MODEL_PROVIDER="fake", PYTHONPATH=str(ROOT / "src"))
+    env.pop("N8N_MCP_URL", None)
+    return subprocess.Popen(
+        [sys.executable, "-u", str(ROOT / "scripts" / "cli.py"), "worker",
+         "--queue", str(queue_path), "--poll", "0.05", "--max-idle", "3"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+
+
+def test_worker_processes_drain_queue_with_fake_llm(tmp_path):
+    queue_path = tmp_path / "queue.sqlite"
+    queue = StepQueue(queue_path)
+    workers = [_start_worker(queue_path) for _ in range(3)]
+    try:
+        # Enqueue only once every worker is polling so they compete for steps.
+        for proc in workers:
+            for line in proc.stdout:
+                if "polling" in line:
+                    break
+        agents = ["pm", "analyst", "architect", "qa", "dev", "po"]
+        ids = [queue.enqueue("run", f"s{i}", agents[i % len(agents)], f"task {i}", {"brief": "x"})
+               for i in range(30)]
+        results = queue.wait_for(ids, poll_interval=0.05, timeout=60)
+    finally:
+        outputs = [proc.communicate(timeout=30)[0] for proc in workers]
+        queue.close()
+
+    assert results == {f"run::s{i}": f"[fake-llm] task {i}" for i in range(30)}
+    assert all(proc.returncode == 0 for proc in workers)
+    done = [int(out.rsplit("exiting after ", 1)[1].split()[0]) for out in outputs]
+    assert sum(done) == 30
+
+
+def test_orchestrator_runs_workflow_through_worker_processes(queued_project):
+    queue_path = queued_project / "queue.sqlite"
+    StepQueue(queue_path).close()
+    workers = [_start_worker(queue_path) for _ in range(3)]
+    try:
+        for proc in workers:
+            for line in proc.stdout:
+                if "polling" in line:
+                    break
+        orch = Orchestrator("plan.yml")
+        orch.run()
+    finally:
+        outputs = [proc.communicate(timeout=30)[0] for proc in workers]
+
+    assert all(proc.returncode == 0 for proc in workers), outputs
+    state = json.loads((queued_project / "deliverables" / "demo" / "state.json").read_text())
+    tasks = {"plan": "Write the plan", "research": "Research the market",
+             "design": "Design the system", "review": "Review the design"}
+    for key, task in tasks.items():
+        assert state[key] == f"[fake-llm] {task}"
+        assert (queued_project / "deliverables" / "demo" / f"{key}.md").read_text() == state[key]
+    assert state["completed"] == ["0:0:pm:plan", "0:1:analyst:research", "0:2:architect:design", "1:0:qa:review"]
+    assert [h["agent"] for h in state["history"]] == ["pm", "analyst", "architect", "qa"]
+
+    # Dependent steps were only enqueued once their inputs had been recorded.
+    queue = StepQueue(queue_path)
+    rows = {row["id"].rsplit("::", 1)[1]: row for row in queue._conn.execute("SELECT * FROM steps")}
+    queue.close()
+    assert json.loads(rows["0:2:architect:design"]["context"]) == {"plan": state["plan"]}
+    assert json.loads(rows["1:0:qa:review"]["context"]) == {"design": state["design"], "research": state["research"]}
+    assert rows["0:1:analyst:research"]["enqueued_at"] < rows["0:2:architect:design"]["enqueued_at"]
+    assert all(row["run_id"] == orch.run_id for row in rows.values())